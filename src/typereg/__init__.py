@@ -9,6 +9,7 @@ __version__ = "0.1.0"
 # NOTE: NOT THREAD SAFE!!!
 
 from typereg.dataclasses import tagged_dataclass
+from typereg.pydantic import get_type_adapter, validator_for_json_list, warmup
 from typereg.registry import Registry, create_registry
 from typereg.utils import (
     by_tag,
@@ -25,8 +26,11 @@ __all__ = [
     "create_registry",
     "get_tag_kwarg",
     "get_tag_to_class_mapping",
+    "get_type_adapter",
     "is_variant",
     "tag_of",
     "tagged_dataclass",
     "tags",
+    "validator_for_json_list",
+    "warmup",
 ]
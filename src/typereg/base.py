@@ -1,13 +1,39 @@
+import dataclasses
 import typing as t
 from weakref import WeakKeyDictionary
 
 SENTINEL = object()
 
+PythonMode = t.Literal["full", "json_only", "instance_only"]
 
-class RegistryState(t.TypedDict):
-    tag_to_class: t.MutableMapping[str, type]
-    class_to_tag: t.MutableMapping[type, str]
+
+@dataclasses.dataclass(slots=True, eq=False)
+class RegistryState:
+    tag_to_class: dict[str, type]
+    class_to_tag: dict[type, str]
     tag_kwarg: str
+    # Bumped on every registration so derived data can tell when it is stale
+    generation: int = 0
+    # States of the registry roots this one derives from, nearest first.
+    # Variants are registered into every one of them.
+    parents: tuple["RegistryState", ...] = ()
+    # Which inputs the Python-mode schema of the registry accepts, see create_registry()
+    python_mode: "PythonMode" = "full"
+    # Result of tags(), built on first use and dropped on every registration
+    tags: frozenset[str] | None = None
 
 
 REGISTRY_STATE: WeakKeyDictionary[type, RegistryState] = WeakKeyDictionary()
+
+# Registry root -> (registry generation when built, union serializer, value tag function).
+# Only the parts of the union schema that don't depend on the Pydantic handler are cached:
+# handler output references definitions owned by a single schema build and can't be reused.
+SCHEMA_CACHE: WeakKeyDictionary[
+    type, tuple[int, t.Callable[..., t.Any], t.Callable[..., t.Any]]
+] = WeakKeyDictionary()
+
+# Type -> TypeAdapter for get_type_adapter(). Cleared whenever a variant is registered, since
+# any cached adapter may cover a registry that just grew. Adapters reference their type, so
+# weak keys wouldn't let entries go either: the oldest entry is evicted past the size limit.
+TYPE_ADAPTERS: dict[t.Any, t.Any] = {}
+TYPE_ADAPTERS_MAX_SIZE = 64
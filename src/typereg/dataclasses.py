@@ -1,9 +1,8 @@
 import dataclasses
-import functools
 import typing as t
 
-from .base import REGISTRY_STATE, SENTINEL
-from .utils import get_existing_field_info, get_parent_registry_root
+from .base import SENTINEL
+from .utils import get_existing_field_info
 
 
 def _dataclass(cls: type | None = None, /, **dataclass_kwargs) -> t.Any:
@@ -62,37 +61,43 @@ def _dataclass(cls: type | None = None, /, **dataclass_kwargs) -> t.Any:
     ```
     """
 
-    @functools.wraps(dataclasses.dataclass)
     def decorator(target_cls: type) -> type:
-        # Check if the class inherits from a Registry and find its state
-        if target_cls not in REGISTRY_STATE:
-            registry_root = get_parent_registry_root(target_cls)
-            if registry_root is None:
-                raise TypeError(
-                    f"Class {target_cls.__name__} must inherit from a Registry to use @tagged_dataclass. "
-                    f"Make sure your class inherits from a Registry class created with create_registry() "
-                    f"or the default Registry."
-                )
-
-            registry_state = REGISTRY_STATE[registry_root]
-
-            # Get the tag kwarg and value for this class
-            tag_kwarg = registry_state["tag_kwarg"]
-            class_to_tag = registry_state["class_to_tag"]
+        # Registered variants carry their tag and tag keyword from __init_subclass__
+        tag_value = target_cls.__dict__.get("__typereg_tag__")
+        if tag_value is None:
+            # Registry roots are plain dataclasses, anything else is a usage error
+            if "__typereg_state__" in target_cls.__dict__:
+                if dataclass_kwargs.get("slots"):
+                    raise TypeError(
+                        f"Registry root {target_cls.__name__} can't be created with slots=True, "
+                        f"declare __slots__ = () in its body instead"
+                    )
+            else:
+                # Set on registry roots and inherited by everything in their registry
+                tag_kwarg = getattr(target_cls, "__typereg_tag_kwarg__", None)
+                if tag_kwarg is None:
+                    raise TypeError(
+                        f"Class {target_cls.__name__} must inherit from a Registry to use @tagged_dataclass. "
+                        f"Make sure your class inherits from a Registry class created with create_registry() "
+                        f"or the default Registry."
+                    )
 
-            # The class should already be registered by Registry.__init_subclass__
-            if target_cls not in class_to_tag:
+                # The class should already be registered by Registry.__init_subclass__
                 raise TypeError(
                     f"Class {target_cls.__name__} is not registered in the registry. "
-                    f"Make sure you provide the {tag_kwarg}= parameter when defining the class."
+                    f"Make sure you provide the {tag_kwarg}= parameter "
+                    f"when defining the class."
                 )
+        else:
+            tag_kwarg = target_cls.__typereg_tag_kwarg__  # type: ignore[attr-defined]
 
-            tag_value = class_to_tag[target_cls]
+            # Already a tagged dataclass, e.g. decorated twice: nothing left to do
+            own_fields = target_cls.__dict__.get("__dataclass_fields__")
+            if own_fields is not None and tag_kwarg in own_fields and not dataclass_kwargs:
+                return target_cls
 
             # Get existing field information
-            existing_annotation, existing_default = get_existing_field_info(
-                target_cls, tag_kwarg
-            )
+            existing_annotation, existing_default = get_existing_field_info(target_cls, tag_kwarg)
 
             if existing_annotation is None and existing_default is SENTINEL:
                 # Ensure __annotations__ exists
@@ -119,7 +124,8 @@ def _dataclass(cls: type | None = None, /, **dataclass_kwargs) -> t.Any:
                         f"Found: annotation={existing_annotation}, default={existing_default!r}."
                     )
 
-        # Apply the dataclass decorator with the tag field included
+        # Apply the dataclass decorator with the tag field included; a new class made for
+        # slots=True replaces target_cls in the registry by itself
         return dataclasses.dataclass(**dataclass_kwargs)(target_cls)
 
     # Handle both @tagged_dataclass and @tagged_dataclass() usage
@@ -1,115 +1,360 @@
+import functools
 import typing as t
+from contextvars import ContextVar
 
+from pydantic import TypeAdapter
 from pydantic_core import core_schema as cs
 
-from .base import REGISTRY_STATE
-from .utils import get_parent_registry_root
+from .base import (
+    REGISTRY_STATE,
+    SCHEMA_CACHE,
+    SENTINEL,
+    TYPE_ADAPTERS,
+    TYPE_ADAPTERS_MAX_SIZE,
+    PythonMode,
+    RegistryState,
+)
+
+# Variant class -> core schema, shared by all registry schemas built while the outermost
+# registry schema is being built. Registries in one hierarchy share variants, and within a
+# single Pydantic schema build the handler returns the same schema for the same variant.
+# The memo must not outlive the build: handler results may reference definitions that only
+# exist in the build that produced them, so storing them on the variant class breaks later
+# TypeAdapters with "not fully defined" errors.
+_VARIANT_SCHEMAS: ContextVar[dict[type, t.Any] | None] = ContextVar(
+    "_VARIANT_SCHEMAS", default=None
+)
+
+# Refs of the registry root schemas currently being built. Pydantic doesn't guard calls to
+# __get_pydantic_core_schema__ against recursion, so a root reached again through one of its
+# own variants is answered with a reference to the schema being built.
+_ROOTS_IN_PROGRESS: ContextVar[frozenset[str]] = ContextVar(
+    "_ROOTS_IN_PROGRESS", default=frozenset()
+)
+
+
+def _variant_schema(handler, variant_class: type) -> t.Any:
+    """Build the schema of ``variant_class`` with the handler of a registry root schema."""
+    try:
+        return handler(variant_class)
+    except LookupError:
+        # The variant is itself being built, e.g. TypeAdapter(variant) of a variant with a
+        # field typed as its own registry: the handler can't inline an unfinished schema
+        generate_schema = getattr(handler, "generate_schema", None)
+        if generate_schema is None:
+            raise
+        return generate_schema(variant_class)
 
 
 def _create_pydantic_tagged_union_schema(
-    tag_to_class: t.Mapping[str, type], tag_kwarg: str, handler
+    state: RegistryState,
+    handler,
+    union_serializer: t.Callable[..., t.Any],
+    tag_of_value: t.Callable[..., t.Any],
+    variant_schemas: dict[type, t.Any],
+    python_mode: PythonMode,
 ) -> t.Any:
     """Create Pydantic schema for tagged unions."""
+    tag_kwarg = state.tag_kwarg
+    # Snapshot the registry: building variant schemas may import code registering more
+    # variants, and the schema must describe one consistent set of them
+    tag_to_class = state.tag_to_class.copy()
+    variants_tuple = tuple(tag_to_class.values())
+
     # Create choices dict for tagged union
-    choices = {tag: handler(variant_class) for tag, variant_class in tag_to_class.items()}
+    choices = {}
+    for tag, variant_class in tag_to_class.items():
+        variant_schema = variant_schemas.get(variant_class)
+        if variant_schema is None:
+            variant_schema = variant_schemas[variant_class] = _variant_schema(
+                handler, variant_class
+            )
+        choices[tag] = variant_schema
 
-    # Create a serializer that adds the tag
-    union_serializer = _create_union_serializer(tag_to_class, tag_kwarg)
+    # For JSON mode, only allow tagged dicts
+    tagged_union_schema = cs.tagged_union_schema(
+        discriminator=tag_kwarg,
+        choices=choices,
+    )
 
-    # Create JsonOrPython schema to handle JSON vs Python validation differently
-    return cs.json_or_python_schema(
-        # For JSON mode, only allow tagged dicts
-        json_schema=cs.tagged_union_schema(
-            discriminator=tag_kwarg,
-            choices=choices,
-        ),
-        # For Python mode, allow both instances and tagged dicts
-        python_schema=cs.union_schema(
+    python_schema: cs.CoreSchema
+    if python_mode == "json_only":
+        python_schema = tagged_union_schema
+    elif python_mode == "instance_only":
+        python_schema = cs.is_instance_schema(variants_tuple)
+    else:
+        # For Python mode, allow both instances and tagged dicts. The instance check goes
+        # first: it is a cheap type check that fails fast for dicts, while trying the tagged
+        # union first would revalidate every instance through its variant schema.
+        python_schema = cs.union_schema(
             [
                 # Accept instances directly
-                cs.is_instance_schema(tuple(tag_to_class.values())),
+                cs.is_instance_schema(variants_tuple),
                 # Accept tagged dicts in Python mode too
-                cs.tagged_union_schema(
-                    discriminator=tag_kwarg,
-                    choices=choices,
-                ),
+                tagged_union_schema,
             ]
-        ),
+        )
+
+    # Create JsonOrPython schema to handle JSON vs Python validation differently
+    return cs.json_or_python_schema(
+        json_schema=tagged_union_schema,
+        python_schema=python_schema,
+        # Serialize through the variant schemas, picked by the exact class of the value, so
+        # nested registry fields keep their tags as well. Anything else, such as unregistered
+        # subclasses of variants or foreign values, falls back to inference: a variant schema
+        # would drop the subclass fields or fail on the missing ones.
         serialization=cs.wrap_serializer_function_ser_schema(
             union_serializer,
-            schema=cs.any_schema(),  # The serializer handles everything
+            schema=(
+                cs.tagged_union_schema(
+                    {**choices, None: cs.any_schema()}, discriminator=tag_of_value
+                )
+                if choices
+                else cs.any_schema()
+            ),
             info_arg=False,
         ),
     )
 
 
-def _create_union_serializer(tag_to_class: t.Mapping[str, type], tag_kwarg: str):
-    """Create a serializer for tagged unions."""
+_UNION_SERIALIZER_SOURCE = """\
+def tag_of_value(value):
+    return variant_tags.get(type(value))
+
+def union_serializer(value, serializer_func):
+    cls = type(value)
+    tag = class_to_tag.get(cls, MISSING)
+    if tag is MISSING:
+        tag = resolve_tag(cls)
+    serialized = serializer_func(value)
+    if tag is not None and (serialized.__class__ is dict or isinstance(serialized, dict)):
+        serialized[{tag_kwarg!r}] = tag
+    return serialized
+"""
+
+_VARIANT_SERIALIZER_SOURCE = """\
+def variant_serializer(value, serializer_func):
+    serialized = serializer_func(value)
+    if serialized.__class__ is dict or isinstance(serialized, dict):
+        # Read tag from instance if available, otherwise use class tag
+        serialized[{tag_kwarg!r}] = getattr(value, {tag_kwarg!r}, {tag!r})
+    return serialized
+"""
+
+
+def _compile_function(
+    source: str, name: str, namespace: dict[str, t.Any]
+) -> t.Callable[..., t.Any]:
+    """Compile ``source`` with ``namespace`` as its globals and return function ``name`` from it."""
+    exec(compile(source, f"<typereg {name}>", "exec"), namespace)
+    function: t.Callable[..., t.Any] = namespace[name]
+    return function
+
 
-    def union_serializer(value, serializer_func):
-        for tag, variant_class in tag_to_class.items():
-            if isinstance(value, variant_class):
-                serialized = serializer_func(value)
-                if isinstance(serialized, dict):
-                    serialized[tag_kwarg] = tag
-                return serialized
-        return serializer_func(value)
+def _create_union_serializer(
+    tag_to_class: t.Mapping[str, type], tag_kwarg: str
+) -> tuple[t.Callable[..., t.Any], t.Callable[..., t.Any]]:
+    """Create a serializer for tagged unions and the function picking the tag of a value."""
+    # Exact variant types resolve with a single dict lookup; other types are resolved
+    # through their MRO once and memoized here, including the ones without a tag.
+    class_to_tag: dict[type, str | None] = {
+        variant_class: tag for tag, variant_class in tag_to_class.items()
+    }
+
+    def resolve_tag(cls: type) -> str | None:
+        tag = None
+        for base in cls.__mro__[1:]:
+            tag = class_to_tag.get(base)
+            if tag is not None:
+                break
+        class_to_tag[cls] = tag
+        return tag
 
-    return union_serializer
+    # The tag key is a literal in the generated code rather than a closure variable.
+    # tag_of_value only knows the exact variant types, class_to_tag also memoizes subclasses.
+    namespace: dict[str, t.Any] = {
+        "class_to_tag": class_to_tag,
+        "variant_tags": dict(class_to_tag),
+        "resolve_tag": resolve_tag,
+        "MISSING": SENTINEL,
+    }
+    union_serializer = _compile_function(
+        _UNION_SERIALIZER_SOURCE.format(tag_kwarg=tag_kwarg), "union_serializer", namespace
+    )
+    return union_serializer, namespace["tag_of_value"]
 
 
+@functools.cache
 def _create_variant_serializer(tag: str, tag_kwarg: str):
-    """Create a serializer for individual variants."""
+    """Create a serializer for individual variants, shared by all schema builds of the variant."""
+    return _compile_function(
+        _VARIANT_SERIALIZER_SOURCE.format(tag=tag, tag_kwarg=tag_kwarg),
+        "variant_serializer",
+        {},
+    )
+
+
+def _create_registry_schema(
+    cls: type, state: RegistryState, handler, python_mode: PythonMode
+) -> t.Any:
+    """Create the tagged union schema of registry root ``cls``."""
+    generation = state.generation
+    cached = SCHEMA_CACHE.get(cls)
+    if cached is None or cached[0] != generation:
+        cached = SCHEMA_CACHE[cls] = (
+            generation,
+            *_create_union_serializer(state.tag_to_class, state.tag_kwarg),
+        )
 
-    def variant_serializer(value, serializer_func):
-        serialized = serializer_func(value)
-        if isinstance(serialized, dict):
-            # Read tag from instance if available, otherwise use class tag
-            serialized[tag_kwarg] = getattr(value, tag_kwarg, tag)
-        return serialized
+    variant_schemas = _VARIANT_SCHEMAS.get()
+    if variant_schemas is not None:
+        return _create_pydantic_tagged_union_schema(
+            state, handler, cached[1], cached[2], variant_schemas, python_mode
+        )
 
-    return variant_serializer
+    # Outermost registry schema of this build: nested registry schemas share its memo
+    variant_schemas = {}
+    token = _VARIANT_SCHEMAS.set(variant_schemas)
+    try:
+        return _create_pydantic_tagged_union_schema(
+            state, handler, cached[1], cached[2], variant_schemas, python_mode
+        )
+    finally:
+        _VARIANT_SCHEMAS.reset(token)
 
 
-def get_registry_pydantic_core_schema(cls: type, source_type, handler, tag_kwarg: str):
+def get_registry_pydantic_core_schema(cls: type, source_type, handler):
     # Check if cls is a registry root (direct or inheriting from our Registry family)
+    state = cls.__dict__.get("__typereg_state__")
+    if state is None:
+        return handler(source_type)
+
+    # This is a registry root - create tagged union schema. The ref matches the one Pydantic
+    # looks up for classes with their own schema method, so every further use of the root in
+    # the same build becomes a reference to this schema.
+    ref = f"{cls.__module__}.{cls.__qualname__}:{id(cls)}"
+    in_progress = _ROOTS_IN_PROGRESS.get()
+    if ref in in_progress:
+        return cs.definition_reference_schema(ref)
+
+    token = _ROOTS_IN_PROGRESS.set(in_progress | {ref})
+    try:
+        schema = _create_registry_schema(cls, state, handler, state.python_mode)
+    finally:
+        _ROOTS_IN_PROGRESS.reset(token)
+    schema["ref"] = ref
+    return schema
+
+
+class _JsonOnly:
+    """``Annotated`` marker validating a registry root from tagged dicts only."""
+
+    def __get_pydantic_core_schema__(self, source_type, handler):
+        state = REGISTRY_STATE.get(source_type)
+        if state is None:
+            raise TypeError(f"{source_type!r} is not a registry root")
+        # Annotated handlers only build the annotated type itself
+        return _create_registry_schema(source_type, state, handler.generate_schema, "json_only")
+
+
+def validator_for_json_list(registry: type) -> TypeAdapter[list[t.Any]]:
+    """
+    Create a TypeAdapter validating lists of tagged dicts into variants of ``registry``.
+
+    Unlike ``TypeAdapter(list[registry])``, the elements are validated by the tagged union
+    alone, without trying the variant instance check first, regardless of the python_mode
+    of the registry. Like the "json_only" python_mode, this also accepts instances of
+    variants with a tag attribute (tagged_dataclass). Create the adapter once and reuse it;
+    variants registered afterwards are not picked up by it.
+    """
+    return TypeAdapter(list[t.Annotated[registry, _JsonOnly()]])  # type: ignore[valid-type]
+
+
+def get_type_adapter(tp: t.Any) -> TypeAdapter[t.Any]:
+    """
+    Get a cached TypeAdapter for ``tp``, typically a registry root or a variant.
+
+    The adapter is rebuilt after any new variant is registered. Up to 64 adapters are
+    kept, the oldest is dropped first. Unhashable types get a fresh adapter on every call.
+    """
     try:
-        state = REGISTRY_STATE[cls]
+        return TYPE_ADAPTERS[tp]  # type: ignore[no-any-return]
     except KeyError:
-        return handler(source_type)
+        pass
+    except TypeError:
+        return TypeAdapter(tp)
+
+    adapter = TypeAdapter(tp)
+    if len(TYPE_ADAPTERS) >= TYPE_ADAPTERS_MAX_SIZE:
+        # Dicts keep insertion order, so the first key is the oldest entry
+        del TYPE_ADAPTERS[next(iter(TYPE_ADAPTERS))]
+    TYPE_ADAPTERS[tp] = adapter
+    return adapter
+
+
+def _with_tag_field_always_serialized(schema: t.Any, tag_kwarg: str) -> t.Any:
+    """
+    Copy of a dataclass ``schema`` whose tag field is serialized even with exclude_defaults.
+
+    Dataclasses with a tag field, like those of tagged_dataclass, serialize their tag without
+    a Python wrap serializer. Only the default of the tag field is in the way: a serializer
+    of its own keeps exclude_defaults from dropping it. Returns None for other schemas.
+    """
+    if schema["type"] != "dataclass" or schema["schema"]["type"] != "dataclass-args":
+        return None
+    if not any(field["name"] == tag_kwarg for field in schema["schema"]["fields"]):
+        return None
+
+    fields = [
+        (
+            {**field, "schema": {**field["schema"], "serialization": cs.simple_ser_schema("str")}}
+            if field["name"] == tag_kwarg
+            else field
+        )
+        for field in schema["schema"]["fields"]
+    ]
+    return {**schema, "schema": {**schema["schema"], "fields": fields}}
 
-    # This is a registry root - create tagged union schema
-    tag_to_class = state["tag_to_class"]
-    return _create_pydantic_tagged_union_schema(tag_to_class, tag_kwarg, handler)
 
+def warmup(*types: t.Any) -> None:
+    """
+    Build the cached TypeAdapters of ``types`` up front, e.g. at application startup.
 
-def get_variant_pydantic_core_schema(cls: type, source_type, handler, tag_kwarg: str):
-    # Find the registry root for this variant in our family
-    registry = get_parent_registry_root(cls)
-    if registry is None:
-        raise AssertionError("No registry root found in this family")
+    The first get_type_adapter() call for each type then doesn't pay for schema generation.
+    Call it after all variants are imported: registering a variant drops the cached adapters.
+    At most TYPE_ADAPTERS_MAX_SIZE types fit in the cache, more would evict the first ones.
+    """
+    if len(types) > TYPE_ADAPTERS_MAX_SIZE:
+        raise ValueError(
+            f"Can't warm up {len(types)} types, at most {TYPE_ADAPTERS_MAX_SIZE} adapters are cached"
+        )
+    for tp in types:
+        get_type_adapter(tp)
 
-    state = REGISTRY_STATE[registry]
 
+def get_variant_pydantic_core_schema(cls: type, source_type, handler):
     # Try to get the default schema for this class
     default_schema = handler(source_type)
 
-    # Get the tag for this specific variant class
-    try:
-        tag = state["class_to_tag"][cls]
-    except KeyError:
-        # This variant is not registered (probably abstract), use default handling
+    # Get the tag for this specific variant class. Subclasses inherit this method but
+    # not the tag: they are not registered (probably abstract), use default handling
+    tag = cls.__dict__.get("__typereg_tag__")
+    if tag is None:
         return default_schema
 
+    tag_kwarg = cls.__typereg_tag_kwarg__  # type: ignore[attr-defined]
+    schema = _with_tag_field_always_serialized(default_schema, tag_kwarg)
+    if schema is not None:
+        return schema
+
     # Create a serializer that adds the tag field
     variant_serializer = _create_variant_serializer(tag, tag_kwarg)
 
     # Return the default schema with our custom serialization
-    return {
-        **default_schema,
-        "serialization": cs.wrap_serializer_function_ser_schema(
-            variant_serializer,
-            schema=default_schema,
-            info_arg=False,
-        ),
-    }
+    schema = default_schema.copy()
+    schema["serialization"] = cs.wrap_serializer_function_ser_schema(
+        variant_serializer,
+        schema=default_schema,
+        info_arg=False,
+    )
+    return schema
@@ -1,14 +1,11 @@
-import functools
+import sys
+import typing as t
 
-from .base import REGISTRY_STATE, SENTINEL, RegistryState
+from .base import REGISTRY_STATE, SENTINEL, TYPE_ADAPTERS, PythonMode, RegistryState
 from .pydantic import get_registry_pydantic_core_schema, get_variant_pydantic_core_schema
-from .utils import (
-    NarrowingMapping,
-    get_parent_registry_root,
-)
 
 
-def create_registry(tag_kwarg: str = "_type_tag"):
+def create_registry(tag_kwarg: str = "_type_tag", python_mode: PythonMode = "full"):
     """
     Create a new Registry family with a specific tag keyword.
 
@@ -21,7 +18,21 @@ def create_registry(tag_kwarg: str = "_type_tag"):
     Registry subclasses abstract base classes by default. Direct Registry subclasses
     become registry roots, while inheriting from both an existing registry and Registry
     creates hierarchical derived registries.
+
+    ``python_mode`` controls what the Pydantic schema of registry roots accepts when
+    validating Python objects:
+    - "full": variant instances and tagged dicts
+    - "json_only": tagged dicts, for code that only validates JSON-like data. The tagged union
+      also reads the tag from attributes, so instances of variants that carry their tag as
+      an attribute (tagged_dataclass) are accepted too; other instances are rejected.
+    - "instance_only": variant instances only
+    JSON validation always expects tagged objects.
     """
+    if python_mode not in t.get_args(PythonMode):
+        raise ValueError(f"Unknown python_mode {python_mode!r}")
+
+    # The tag keyword and tags end up as keys of every serialized dict
+    tag_kwarg = sys.intern(tag_kwarg)
 
     class Registry:
         """
@@ -34,47 +45,57 @@ def create_registry(tag_kwarg: str = "_type_tag"):
         - Concrete variant: class X(Root, tag_kwarg="...")  # tag is REQUIRED and UNIQUE
         """
 
-        @classmethod
-        def __get_pydantic_core_schema__(cls, source_type, handler):
-            return get_registry_pydantic_core_schema(cls, source_type, handler, tag_kwarg)
+        # Lets registries and variants that declare __slots__ have instances without __dict__
+        __slots__ = ()
+
+        __get_pydantic_core_schema__: t.ClassVar[t.Any] = classmethod(
+            get_registry_pydantic_core_schema
+        )
 
         def __init_subclass__(cls, **kwargs):
             tag = kwargs.pop(tag_kwarg, SENTINEL)
 
             super().__init_subclass__(**kwargs)
 
-            parent_registry = get_parent_registry_root(cls)
+            # cls itself can't be registered yet, so the first registry root in the rest
+            # of its MRO is the one it belongs to (or derives from). Roots are the classes
+            # holding their state in their own __dict__, which is cheaper to check than
+            # REGISTRY_STATE membership.
+            parent_registry = None
+            for base in cls.__mro__[1:]:
+                if "__typereg_state__" in base.__dict__:
+                    parent_registry = base
+                    break
 
             # Check if this is a direct Registry subclass (becomes a new registry root)
             if Registry in cls.__bases__:
-                parent_state = (
-                    RegistryState(
-                        tag_to_class={},
-                        class_to_tag={},
-                        tag_kwarg=tag_kwarg,
-                    )
-                    if parent_registry is None
-                    else REGISTRY_STATE[parent_registry]
-                )
-
-                REGISTRY_STATE[cls] = RegistryState(
-                    tag_to_class=NarrowingMapping(parent_state["tag_to_class"]),
-                    class_to_tag=NarrowingMapping(parent_state["class_to_tag"]),
-                    tag_kwarg=tag_kwarg,
-                )
-
                 # Registry roots should not have tags themselves
                 if tag is not SENTINEL:
                     raise TypeError(f"Registry root {cls.__name__} should not have {tag_kwarg}=")
 
-                # Add the Pydantic schema method only to registry roots
                 if "__get_pydantic_core_schema__" in cls.__dict__:
                     raise TypeError(
                         f"Registry root {cls.__name__} should not have own __get_pydantic_core_schema__"
                     )
-                cls.__get_pydantic_core_schema__ = classmethod(
-                    functools.partial(get_registry_pydantic_core_schema, tag_kwarg=tag_kwarg)
-                )  # type: ignore
+
+                if parent_registry is None:
+                    parents: tuple[RegistryState, ...] = ()
+                else:
+                    parent_state = parent_registry.__typereg_state__  # type: ignore[attr-defined]
+                    parents = (parent_state, *parent_state.parents)
+
+                REGISTRY_STATE[cls] = cls.__typereg_state__ = RegistryState(  # type: ignore[attr-defined]
+                    tag_to_class={},
+                    class_to_tag={},
+                    tag_kwarg=tag_kwarg,
+                    python_mode=python_mode,
+                    parents=parents,
+                )
+                # Inherited by everything in the registry, see get_tag_kwarg()
+                cls.__typereg_tag_kwarg__ = tag_kwarg  # type: ignore[attr-defined]
+
+                # Add the Pydantic schema method only to registry roots
+                cls.__get_pydantic_core_schema__ = classmethod(get_registry_pydantic_core_schema)
                 return
 
             if parent_registry is None:
@@ -82,34 +103,77 @@ def create_registry(tag_kwarg: str = "_type_tag"):
                 return
 
             # Check for incompatible registry families
-            registry_state = REGISTRY_STATE[parent_registry]
-
-            # Get state from the registry root
-            tag_to_class = registry_state["tag_to_class"]
-            class_to_tag = registry_state["class_to_tag"]
+            registry_state = parent_registry.__typereg_state__  # type: ignore[attr-defined]
 
             # Concrete variant: tag required + unique
             if tag is SENTINEL:
+                # Class decorators that return a new class, like dataclasses with slots=True,
+                # copy the class __dict__ with the registration attributes set below: such a
+                # copy takes the place of the variant it was made from
+                copied_tag = cls.__dict__.get("__typereg_tag__")
+                if copied_tag is not None and copied_tag in registry_state.tag_to_class:
+                    replace_variant(registry_state.tag_to_class[copied_tag], cls)
                 return
 
-            if not isinstance(tag, str) or not tag:
+            if type(tag) is not str:
+                if not isinstance(tag, str):
+                    raise TypeError(f"{tag_kwarg} must be a non-empty string")
+                # Plain string value of str subclasses such as str enums (str() of those
+                # may give the member name), sys.intern() only takes exact strings
+                tag = str.__str__(tag)
+            if not tag:
                 raise TypeError(f"{tag_kwarg} must be a non-empty string")
+            tag = sys.intern(tag)
 
-            # Register the class in its registry
-            tag_to_class[tag] = cls
-            class_to_tag[cls] = tag
-
-            # Add Pydantic schema method to variant classes so they include their tag when serialized
+            # Reject invalid variants before they are registered anywhere
             if "__get_pydantic_core_schema__" in cls.__dict__:
                 raise TypeError(
                     f"Variant {cls.__name__} should not have own __get_pydantic_core_schema__"
                 )
-            cls.__get_pydantic_core_schema__ = classmethod(
-                functools.partial(get_variant_pydantic_core_schema, tag_kwarg=tag_kwarg)
-            )  # type: ignore
+
+            # The topmost registry root sees every variant of the hierarchy,
+            # so tags must be unique there
+            family_state = (registry_state.parents or (registry_state,))[-1]
+            if tag in family_state.tag_to_class:
+                raise KeyError(f"Tag '{tag}' conflicts with existing variant")
+
+            # Register the class in its registry and all registries it derives from
+            for state in (registry_state, *registry_state.parents):
+                state.tag_to_class[tag] = cls
+                state.class_to_tag[cls] = tag
+                state.generation += 1
+                state.tags = None
+            TYPE_ADAPTERS.clear()
+
+            # Remember the owning registry root, tag and tag keyword for tagged_dataclass and
+            # the schema hook, so they need neither an MRO walk nor a registry lookup
+            cls.__typereg_root__ = parent_registry  # type: ignore[attr-defined]
+            cls.__typereg_tag__ = tag  # type: ignore[attr-defined]
+            cls.__typereg_tag_kwarg__ = tag_kwarg  # type: ignore[attr-defined]
+
+            # Add Pydantic schema method to variant classes so they include their tag when serialized
+            cls.__get_pydantic_core_schema__ = classmethod(get_variant_pydantic_core_schema)
 
     return Registry
 
 
+def replace_variant(old: type, new: type) -> None:
+    """
+    Register ``new`` in place of variant ``old``.
+
+    Called by ``Registry.__init_subclass__`` for copies of registered variants made by class
+    decorators that return a new class, like dataclasses with slots=True. The new class must
+    be a copy of ``old``, including the attributes set on it at registration.
+    """
+    tag = old.__typereg_tag__  # type: ignore[attr-defined]
+    registry_state = old.__typereg_root__.__typereg_state__  # type: ignore[attr-defined]
+    for state in (registry_state, *registry_state.parents):
+        state.tag_to_class[tag] = new
+        del state.class_to_tag[old]
+        state.class_to_tag[new] = tag
+        state.generation += 1
+    TYPE_ADAPTERS.clear()
+
+
 # Create the default Registry class for backward compatibility
 Registry = create_registry("_type_tag")
@@ -0,0 +1,91 @@
+import dataclasses
+
+import pytest
+from pydantic import TypeAdapter
+
+from typereg import Registry, create_registry
+
+
+def pytest_collection_modifyitems(config, items):
+    # Longest jobs first, so that parallel workers don't wait on a slow test at the end
+    items.sort(key=lambda item: item.get_closest_marker("slow") is None)
+
+
+@pytest.fixture
+def fresh_registry():
+    """A Registry base of its own, so registrations can't leak between tests."""
+    return create_registry("_type_tag")
+
+
+@pytest.fixture(scope="module")
+def ab_registry():
+    """A read-only registry root with two dataclass variants, tagged "a" and "b"."""
+
+    class TestRegistry(create_registry("_type_tag")):
+        pass
+
+    @dataclasses.dataclass
+    class VariantA(TestRegistry, _type_tag="a"):  # type: ignore[misc]
+        pass
+
+    @dataclasses.dataclass
+    class VariantB(TestRegistry, _type_tag="b"):  # type: ignore[misc]
+        pass
+
+    return TestRegistry, VariantA, VariantB
+
+
+@pytest.fixture(scope="module")
+def registry_adapter():
+    """A TypeAdapter of a registry root with two variants, for tests that only validate."""
+
+    class TestRegistry(Registry):
+        pass
+
+    @dataclasses.dataclass
+    class VariantA(TestRegistry, _type_tag="variant_a"):  # type: ignore[misc]
+        value: int
+
+    @dataclasses.dataclass
+    class VariantB(TestRegistry, _type_tag="variant_b"):  # type: ignore[misc]
+        name: str
+
+    return TypeAdapter(TestRegistry), VariantA, VariantB
+
+
+@pytest.fixture(scope="module")
+def direct_variants():
+    """Variants of registries with default and custom tag keywords, keyed by name."""
+
+    class TestRegistry(Registry):
+        pass
+
+    class DocumentRegistry(create_registry("type")):
+        pass
+
+    class KindRegistry(create_registry("kind")):
+        pass
+
+    @dataclasses.dataclass
+    class DataclassVariant(TestRegistry, _type_tag="dataclass_variant"):  # type: ignore[misc]
+        value: int
+        name: str
+
+    @dataclasses.dataclass
+    class TextDocument(DocumentRegistry, type="text"):  # type: ignore[misc]
+        content: str
+        language: str = "en"
+
+    @dataclasses.dataclass
+    class ImageDocument(DocumentRegistry, type="image"):  # type: ignore[misc]
+        url: str
+        width: int
+        height: int
+
+    @dataclasses.dataclass
+    class KindVariant(KindRegistry, kind="kind_variant"):  # type: ignore[misc]
+        y: str
+
+    return {
+        cls.__name__: cls for cls in (DataclassVariant, TextDocument, ImageDocument, KindVariant)
+    }